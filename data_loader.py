@@ -235,7 +235,7 @@ def get_investor_summary(holdings_df):
             'Number of Holdings': len(holdings_df)
         }])
     
-    summary = holdings_df.groupby('NAME').agg({
+    summary = holdings_df.groupby('NAME', observed=True).agg({
         'Demat Holding Vlaue (Rs.)': 'sum',
         'Holding': 'count'
     }).reset_index()
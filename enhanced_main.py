@@ -123,6 +123,49 @@ def calculate_monthly_returns(data_series, start_date='2024-04-01'):
     return monthly_returns
 
 
+def calculate_monthly_returns_batch(portfolios, start_date='2024-04-01'):
+    """
+    Calculate monthly returns for many series at once with a single resample
+    Per series, the result matches calculate_monthly_returns
+    
+    Returns:
+        dict: Name -> monthly returns (series with no data after start_date are dropped)
+    """
+    if not portfolios:
+        return {}
+    
+    portfolios_df = pd.DataFrame(portfolios)
+    portfolios_df.index = pd.to_datetime(portfolios_df.index)
+    
+    # Remove timezone info if present to avoid comparison issues
+    if portfolios_df.index.tz is not None:
+        portfolios_df.index = portfolios_df.index.tz_localize(None)
+    
+    # Filter data from start date
+    start_dt = pd.to_datetime(start_date)
+    portfolios_df = portfolios_df[portfolios_df.index >= start_dt]
+    
+    if len(portfolios_df) == 0:
+        return {}
+    
+    # Resample every column to month end in one pass
+    monthly_df = portfolios_df.resample('ME').last()
+    
+    # Cumulative returns against each series' first value from the start date
+    initial_values = portfolios_df.bfill().iloc[0]
+    returns_df = (monthly_df / initial_values - 1) * 100
+    returns_df.loc[:, initial_values == 0] = 0
+    
+    # Trim each column back to the months that series actually covers
+    monthly_returns = {}
+    for name, monthly_data in monthly_df.items():
+        first, last = monthly_data.first_valid_index(), monthly_data.last_valid_index()
+        if first is not None:
+            monthly_returns[name] = returns_df.loc[first:last, name]
+    
+    return monthly_returns
+
+
 def calculate_investor_portfolios(holdings_df, stock_data, investment_date='2024-04-01'):
     """
     Calculate portfolio value over time for each investor
@@ -316,13 +359,10 @@ def main():
     
     # Step 7: Calculate monthly returns for each investor
     print("\nStep 7: Calculating monthly returns...")
-    monthly_returns = {}
+    monthly_returns = calculate_monthly_returns_batch(investor_portfolios, INVESTMENT_DATE)
     
-    for investor_name, portfolio_series in investor_portfolios.items():
-        monthly_ret = calculate_monthly_returns(portfolio_series, INVESTMENT_DATE)
-        if len(monthly_ret) > 0:
-            monthly_returns[investor_name] = monthly_ret
-            print(f"  ✓ {investor_name}: {len(monthly_ret)} months")
+    for investor_name, monthly_ret in monthly_returns.items():
+        print(f"  ✓ {investor_name}: {len(monthly_ret)} months")
     
     # Step 8: Calculate NIFTY returns
     print("\nStep 8: Fetching NIFTY 50 data...")
@@ -19,7 +19,34 @@ try:
     from config import OUTPUT_DIR
 except:
     OUTPUT_DIR = Path(__file__).parent / 'output'
-    OUTPUT_DIR.mkdir(exist_ok=True)
+
+# Created once here so the chart writers below never need to
+OUTPUT_DIR = Path(OUTPUT_DIR)
+OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+# Color palette for investors (TradingView style) - cycled when there are more investors
+INVESTOR_COLORS = (
+    '#2962FF', '#00BCD4', '#00E676', '#FFD600', '#FF6D00',
+    '#FF1744', '#D500F9', '#651FFF', '#00E5FF', '#76FF03',
+    '#FFEA00', '#FF3D00', '#F50057', '#AA00FF', '#00B8D4',
+    '#64DD17', '#FFD740', '#FF6E40', '#FF4081', '#7C4DFF',
+    '#18FFFF', '#69F0AE', '#FFE57F', '#FF8A65', '#FF80AB',
+    '#82B1FF', '#84FFFF', '#B2FF59', '#FFE082', '#FFAB91'
+)
+
+# GM fund lines on the dashboard, in (multi_cap, mid_small) order: (name, color, width, dash)
+FUND_LINES = (
+    ('GM Multi Cap', '#4CAF50', 2.5, 'dash'),
+    ('GM Mid & Small Cap', '#FF9800', 2.5, 'dot'),
+)
+
+# With more investors than this, every line on the returns chart is drawn with WebGL
+SCATTERGL_MIN_INVESTORS = 4
+
+
+def _trace_xy(series):
+    """Plain NumPy x/y arrays for a trace - Plotly serializes these as typed arrays"""
+    return series.index.to_numpy(), series.to_numpy(dtype=np.float64)
 
 
 def create_interactive_comparison_dashboard(viz_data):
@@ -48,26 +75,18 @@ def create_interactive_comparison_dashboard(viz_data):
                [{"secondary_y": False}]]
     )
     
-    # Color palette for investors (TradingView style)
-    colors = [
-        '#2962FF', '#00BCD4', '#00E676', '#FFD600', '#FF6D00',
-        '#FF1744', '#D500F9', '#651FFF', '#00E5FF', '#76FF03',
-        '#FFEA00', '#FF3D00', '#F50057', '#AA00FF', '#00B8D4',
-        '#64DD17', '#FFD740', '#FF6E40', '#FF4081', '#7C4DFF',
-        '#18FFFF', '#69F0AE', '#FFE57F', '#FF8A65', '#FF80AB',
-        '#82B1FF', '#84FFFF', '#B2FF59', '#FFE082', '#FFAB91'
-    ]
-    
-    # Extend colors if needed
-    while len(colors) < len(investors):
-        colors.extend(colors)
+    # Many SVG paths make the HTML slow to open, so larger dashboards hand every
+    # returns line to WebGL - all of them, since WebGL draws above SVG and a mix
+    # would bury the benchmark lines under the investors
+    line_cls = go.Scattergl if len(investors) > SCATTERGL_MIN_INVESTORS else go.Scatter
     
     # Add NIFTY 50 as the main benchmark (thick line)
     if len(nifty) > 0:
+        nifty_x, nifty_y = _trace_xy(nifty)
         fig.add_trace(
-            go.Scatter(
-                x=nifty.index,
-                y=nifty.values,
+            line_cls(
+                x=nifty_x,
+                y=nifty_y,
                 name='NIFTY 50',
                 mode='lines',
                 line=dict(color='#FF0000', width=3, dash='solid'),
@@ -80,13 +99,13 @@ def create_interactive_comparison_dashboard(viz_data):
         )
         
         # Add NIFTY monthly bars
-        monthly_changes = nifty.diff()
-        colors_bars = ['#26A69A' if x >= 0 else '#EF5350' for x in monthly_changes.values]
+        monthly_changes = np.diff(nifty_y, prepend=np.nan)
+        colors_bars = np.where(monthly_changes >= 0, '#26A69A', '#EF5350')
         
         fig.add_trace(
             go.Bar(
-                x=nifty.index,
-                y=monthly_changes.values,
+                x=nifty_x,
+                y=monthly_changes,
                 name='NIFTY 50 Monthly',
                 marker_color=colors_bars,
                 legendgroup='benchmark',
@@ -96,34 +115,22 @@ def create_interactive_comparison_dashboard(viz_data):
             row=2, col=1
         )
     
-    # Add GM Multi Cap Fund
-    if len(multi_cap) > 0:
-        fig.add_trace(
-            go.Scatter(
-                x=multi_cap.index,
-                y=multi_cap.values,
-                name='GM Multi Cap',
-                mode='lines',
-                line=dict(color='#4CAF50', width=2.5, dash='dash'),
-                legendgroup='funds',
-                legendgrouptitle_text='Mutual Funds',
-                hovertemplate='<b>GM Multi Cap</b><br>Date: %{x|%b %Y}<br>Return: %{y:.2f}%<extra></extra>',
-                visible=True
-            ),
-            row=1, col=1
-        )
-    
-    # Add GM Mid & Small Cap Fund
-    if len(mid_small) > 0:
+    # Add GM Multi Cap and GM Mid & Small Cap Funds
+    funds = zip(FUND_LINES, (multi_cap, mid_small))
+    for i, ((fund_name, color, width, dash), fund) in enumerate(funds):
+        if len(fund) == 0:
+            continue
+        fund_x, fund_y = _trace_xy(fund)
         fig.add_trace(
-            go.Scatter(
-                x=mid_small.index,
-                y=mid_small.values,
-                name='GM Mid & Small Cap',
+            line_cls(
+                x=fund_x,
+                y=fund_y,
+                name=fund_name,
                 mode='lines',
-                line=dict(color='#FF9800', width=2.5, dash='dot'),
+                line=dict(color=color, width=width, dash=dash),
                 legendgroup='funds',
-                hovertemplate='<b>GM Mid & Small Cap</b><br>Date: %{x|%b %Y}<br>Return: %{y:.2f}%<extra></extra>',
+                legendgrouptitle_text='Mutual Funds' if i == 0 else None,
+                hovertemplate=f'<b>{fund_name}</b><br>Date: %{{x|%b %Y}}<br>Return: %{{y:.2f}}%<extra></extra>',
                 visible=True
             ),
             row=1, col=1
@@ -135,15 +142,16 @@ def create_interactive_comparison_dashboard(viz_data):
         if len(returns) > 0:
             # Calculate investment amount
             inv_amount = investments.get(investor_name, 0)
+            x, y = _trace_xy(returns)
             
             # Add line trace
             fig.add_trace(
-                go.Scatter(
-                    x=returns.index,
-                    y=returns.values,
+                line_cls(
+                    x=x,
+                    y=y,
                     name=f"{investor_name[:25]}",
                     mode='lines',
-                    line=dict(color=colors[color_idx], width=1.5),
+                    line=dict(color=INVESTOR_COLORS[color_idx % len(INVESTOR_COLORS)], width=1.5),
                     legendgroup='investors',
                     legendgrouptitle_text='Individual Investors',
                     hovertemplate=f'<b>{investor_name}</b><br>' +
@@ -174,10 +182,11 @@ def create_interactive_comparison_dashboard(viz_data):
             if values:
                 avg_returns[date] = np.mean(values)
         
+        avg_x, avg_y = _trace_xy(avg_returns)
         fig.add_trace(
-            go.Scatter(
-                x=avg_returns.index,
-                y=avg_returns.values,
+            line_cls(
+                x=avg_x,
+                y=avg_y,
                 name='Average Investor',
                 mode='lines',
                 line=dict(color='#9C27B0', width=2.5, dash='dashdot'),
@@ -296,44 +305,46 @@ def create_interactive_comparison_dashboard(viz_data):
     )
 
     
+    # Final return per investor as one array - shared by the annotation and the JSON summary
+    final_names = [name for name, ret in investors.items() if len(ret) > 0]
+    finals = np.fromiter(
+        (investors[name].iat[-1] for name in final_names),
+        dtype=np.float64, count=len(final_names)
+    )
+    
     # Add annotations for key statistics
-    if len(investors) > 0:
-        # Calculate statistics
-        latest_returns = {name: ret.iloc[-1] for name, ret in investors.items() if len(ret) > 0}
+    if len(finals) > 0:
+        best_i, worst_i = int(finals.argmax()), int(finals.argmin())
+        avg_return = finals.mean()
         
-        if latest_returns:
-            best_performer = max(latest_returns.items(), key=lambda x: x[1])
-            worst_performer = min(latest_returns.items(), key=lambda x: x[1])
-            avg_return = np.mean(list(latest_returns.values()))
-            
-            # Add annotation box
-            annotation_text = (
-                f"<b>📊 Performance Statistics</b><br>"
-                f"Best: {best_performer[0][:20]} ({best_performer[1]:.1f}%)<br>"
-                f"Worst: {worst_performer[0][:20]} ({worst_performer[1]:.1f}%)<br>"
-                f"Average: {avg_return:.1f}%"
-            )
-            
-            if len(nifty) > 0:
-                nifty_return = nifty.iloc[-1]
-                outperformers = sum(1 for ret in latest_returns.values() if ret > nifty_return)
-                annotation_text += f"<br>Beat NIFTY: {outperformers}/{len(latest_returns)}"
-            
-            fig.add_annotation(
-                text=annotation_text,
-                xref="paper",
-                yref="paper",
-                x=0.01,
-                y=0.55,
-                xanchor="left",
-                yanchor="top",
-                showarrow=False,
-                bgcolor="rgba(19, 23, 34, 0.95)",
-                bordercolor="#2A2E39",
-                borderwidth=1,
-                font=dict(size=11, color='#D1D4DC'),
-                align="left"
-            )
+        # Add annotation box
+        annotation_text = (
+            f"<b>📊 Performance Statistics</b><br>"
+            f"Best: {final_names[best_i][:20]} ({finals[best_i]:.1f}%)<br>"
+            f"Worst: {final_names[worst_i][:20]} ({finals[worst_i]:.1f}%)<br>"
+            f"Average: {avg_return:.1f}%"
+        )
+        
+        if len(nifty) > 0:
+            nifty_return = nifty.iloc[-1]
+            outperformers = np.count_nonzero(finals > nifty_return)
+            annotation_text += f"<br>Beat NIFTY: {outperformers}/{len(finals)}"
+        
+        fig.add_annotation(
+            text=annotation_text,
+            xref="paper",
+            yref="paper",
+            x=0.01,
+            y=0.55,
+            xanchor="left",
+            yanchor="top",
+            showarrow=False,
+            bgcolor="rgba(19, 23, 34, 0.95)",
+            bordercolor="#2A2E39",
+            borderwidth=1,
+            font=dict(size=11, color='#D1D4DC'),
+            align="left"
+        )
     
     # Save the dashboard
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -341,7 +352,8 @@ def create_interactive_comparison_dashboard(viz_data):
     filepath = OUTPUT_DIR / filename
     
     # Write HTML with custom CSS for TradingView styling
-    html_string = fig.to_html(include_plotlyjs='cdn')
+    html_string = fig.to_html(include_plotlyjs='cdn', full_html=True,
+                              include_mathjax=False, validate=False)
     
     # Add custom CSS
     custom_css = """
@@ -381,9 +393,8 @@ def create_interactive_comparison_dashboard(viz_data):
     }
     
     if len(investors) > 0:
-        latest_returns = {name: float(ret.iloc[-1]) for name, ret in investors.items() if len(ret) > 0}
-        json_data['summary']['investor_returns'] = latest_returns
-        json_data['summary']['average_return'] = float(np.mean(list(latest_returns.values())))
+        json_data['summary']['investor_returns'] = dict(zip(final_names, finals.tolist()))
+        json_data['summary']['average_return'] = float(np.mean(finals))
         
         if len(nifty) > 0:
             json_data['summary']['nifty_return'] = float(nifty.iloc[-1])
@@ -459,7 +470,9 @@ def create_investor_ranking_chart(investors, benchmarks):
     
     # Save
     filepath = OUTPUT_DIR / f"ranking_chart_{datetime.now().strftime('%Y%m%d')}.html"
-    fig.write_html(str(filepath))
+    # Load plotly.js from the CDN rather than embedding ~3 MB into every file
+    fig.write_html(str(filepath), include_plotlyjs='cdn', full_html=True,
+                   include_mathjax=False, validate=False, auto_open=False)
     
     return filepath
 
@@ -152,7 +152,7 @@ def calculate_investor_wise_investments(investment_df):
         }])
     
     # Group by investor
-    investor_summary = investment_df.groupby('NAME').agg({
+    investor_summary = investment_df.groupby('NAME', observed=True).agg({
         'Investment_Value': 'sum',
         'Demat Holding Vlaue (Rs.)': 'sum',
         'Gain_Loss': 'sum',
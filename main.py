@@ -11,7 +11,7 @@ from data_loader import load_holdings_data, load_both_funds_from_sheet
 from market_data import fetch_nifty_data
 from ticker_resolver import resolve_all_tickers, save_ticker_report
 from nse_data_loader import load_all_nse_data, get_nse_data_stats
-from smart_calculator import calculate_portfolio_with_partial_data, calculate_coverage_stats, export_coverage_report
+from smart_calculator import calculate_portfolio_with_partial_data, calculate_coverage_stats, export_coverage_report, group_by_investor
 from visualizer import create_fund_comparison_chart, save_chart
 
 
@@ -130,11 +130,15 @@ def main():
         print("\n❌ No dates in stock data")
         return
     
+    # Group holdings by investor once - shared by the portfolio and coverage calculations
+    investor_groups = group_by_investor(holdings_df)
+    
     # Actual investor portfolio
     investor_portfolios = calculate_portfolio_with_partial_data(
         holdings_df, 
         stock_data, 
-        all_dates
+        all_dates,
+        groups=investor_groups
     )
     
     # Combine all investor portfolios into one (if multiple investors)
@@ -232,7 +236,7 @@ def main():
     print(f"\n🏆 Best Performer: {best[0]} ({best[1]:.2f}%)")
     
     # Calculate coverage
-    cov_stats = calculate_coverage_stats(holdings_df, stock_data)
+    cov_stats = calculate_coverage_stats(holdings_df, stock_data, groups=investor_groups)
     print(f"\n📈 Portfolio Coverage:")
     print(f"  Total investors: {len(cov_stats)}")
     print(f"  Average coverage: {cov_stats['Coverage %'].mean():.1f}%")
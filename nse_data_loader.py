@@ -95,19 +95,26 @@ def load_all_nse_data(ticker_map, start_date):
     print(f"Total Securities: {len(ticker_map)}")
     print("="*80 + "\n")
     
+    # Collect status lines and write them once - per-row flushed prints dominate the loop
+    lines = []
+    total = len(ticker_map)
+    
     for idx, (security_name, ticker) in enumerate(ticker_map.items(), 1):
-        print(f"[{idx:3d}/{len(ticker_map)}] {security_name[:50]:50s} ", end='', flush=True)
+        prefix = f"[{idx:3d}/{total}] {security_name[:50]:50s} "
         
         data = load_stock_data_from_nse(ticker, start_date)
         
         if len(data) > 0:
             stock_data[security_name] = data
-            print(f"✓ ({len(data)} months)")
+            lines.append(f"{prefix}✓ ({len(data)} months)")
             success_count += 1
         else:
-            print("✗ no data")
+            lines.append(f"{prefix}✗ no data")
             failed_count += 1
     
+    if lines:
+        print("\n".join(lines))
+    
     print("\n" + "="*80)
     print(f"SUCCESS: {success_count}/{len(ticker_map)} securities loaded")
     print(f"FAILED:  {failed_count}/{len(ticker_map)} securities")
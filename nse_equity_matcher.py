@@ -3,46 +3,110 @@ NSE EQUITY MATCHER
 Uses official EQUITY_L.csv from NSE to find exact ticker matches
 """
 import pandas as pd
+import numpy as np
 import re
-from difflib import SequenceMatcher
+import json
+import pickle
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from rapidfuzz import fuzz, process
 
 
+# On-disk cache for cleaned NSE names and resolved holdings
+CACHE_DIR = Path('.cache')
+
+
+# Common suffixes removed from company names, as a single alternation
+_REMOVE_WORDS_RE = re.compile(r'\b(?:' + '|'.join([
+    'LIMITED', 'LTD', 'LTD.', 'PRIVATE', 'PVT', 'PVT.',
+    'COMPANY', 'CO', 'CO.', 'CORPORATION', 'CORP', 'CORP.',
+    'ENTERPRISES', 'INDUSTRIES', 'INTERNATIONAL',
+]) + r')\b')
+
+# Equity markers and face values
+_EQUITY_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in [
+        r'EQ\s*NEW.*', r'EQ\s*EQ', r'EQ\s*F\.?V\.?.*', r'EQ\s*RS\.?.*',
+        r'NEW\s*FV.*', r'NEW\s*RS\.?.*', r'F\.?V\.?\s*RS\.?.*',
+        r'RE\.?\s*\d+', r'RS\.?\s*\d+', r'\d+/-', r'\d+/\d+',
+    ]
+]
+
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s&]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Bump when clean_company_name changes in a way the regexes below don't capture;
+# both feed the nse_clean.pkl and resolved_*.json cache keys so stale cleaned
+# names and matches are not reused
+CLEAN_NAMES_VERSION = 1
+_CLEANING_RULES = (
+    CLEAN_NAMES_VERSION,
+    _REMOVE_WORDS_RE.pattern,
+    *(pattern.pattern for pattern in _EQUITY_PATTERNS),
+    _SPECIAL_CHARS_RE.pattern,
+    _WHITESPACE_RE.pattern,
+)
+
+
+@lru_cache(maxsize=8192)
 def clean_company_name(name):
-    """Clean company name for matching"""
+    """Clean company name for matching (memoized - the same names are cleaned repeatedly)"""
     name = str(name).upper()
     
     # Remove common suffixes
-    remove_patterns = [
-        'LIMITED', 'LTD', 'LTD.', 'PRIVATE', 'PVT', 'PVT.',
-        'COMPANY', 'CO', 'CO.', 'CORPORATION', 'CORP', 'CORP.',
-        'ENTERPRISES', 'INDUSTRIES', 'INTERNATIONAL',
-    ]
-    
-    for pattern in remove_patterns:
-        name = re.sub(r'\b' + pattern + r'\b', '', name)
+    name = _REMOVE_WORDS_RE.sub('', name)
     
     # Remove equity markers and face values
-    equity_patterns = [
-        r'EQ\s*NEW.*', r'EQ\s*EQ', r'EQ\s*F\.?V\.?.*', r'EQ\s*RS\.?.*',
-        r'NEW\s*FV.*', r'NEW\s*RS\.?.*', r'F\.?V\.?\s*RS\.?.*',
-        r'RE\.?\s*\d+', r'RS\.?\s*\d+', r'\d+/-', r'\d+/\d+',
-    ]
-    
-    for pattern in equity_patterns:
-        name = re.sub(pattern, '', name, flags=re.IGNORECASE)
+    for pattern in _EQUITY_PATTERNS:
+        name = pattern.sub('', name)
     
     # Remove special characters except &
-    name = re.sub(r'[^\w\s&]', ' ', name)
+    name = _SPECIAL_CHARS_RE.sub(' ', name)
     
     # Remove extra spaces
-    name = re.sub(r'\s+', ' ', name).strip()
+    name = _WHITESPACE_RE.sub(' ', name).strip()
     
     return name
 
 
-def similarity_score(str1, str2):
-    """Calculate similarity between two strings"""
-    return SequenceMatcher(None, str1, str2).ratio()
+def _fingerprint(items):
+    """Short sha256 digest of a sequence of values, used as a cache key"""
+    digest = hashlib.sha256()
+    for item in items:
+        digest.update(str(item).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()[:16]
+
+
+def load_clean_nse_names(nse_dict):
+    """
+    Cleaned NSE company names in nse_dict order
+    Cached on disk, keyed on the NSE names and the cleaning rules, so unchanged
+    lists skip re-cleaning
+    """
+    key = _fingerprint((*_CLEANING_RULES, *nse_dict))
+    cache_file = CACHE_DIR / 'nse_clean.pkl'
+    
+    try:
+        with open(cache_file, 'rb') as f:
+            cached = pickle.load(f)
+        if cached.get('key') == key:
+            return cached['names']
+    except Exception:
+        pass
+    
+    clean_names = [clean_company_name(name) for name in nse_dict]
+    
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        with open(cache_file, 'wb') as f:
+            pickle.dump({'key': key, 'names': clean_names}, f)
+    except OSError as e:
+        print(f"⚠️  Could not write NSE name cache: {e}")
+    
+    return clean_names
 
 
 def load_nse_equity_list(csv_file='EQUITY_L.csv'):
@@ -53,12 +117,10 @@ def load_nse_equity_list(csv_file='EQUITY_L.csv'):
         # Clean column names
         df.columns = df.columns.str.strip()
         
-        # Create lookup dictionary
-        nse_dict = {}
-        for _, row in df.iterrows():
-            symbol = str(row['SYMBOL']).strip()
-            company_name = str(row['NAME OF COMPANY']).strip()
-            nse_dict[company_name.upper()] = symbol
+        # Create lookup dictionary (column-wise, no per-row iteration)
+        symbols = df['SYMBOL'].astype(str).str.strip()
+        company_names = df['NAME OF COMPANY'].astype(str).str.strip().str.upper()
+        nse_dict = dict(zip(company_names, symbols))
         
         return nse_dict
     
@@ -67,77 +129,143 @@ def load_nse_equity_list(csv_file='EQUITY_L.csv'):
         return {}
 
 
-def find_best_match(holdings_name, nse_dict, threshold=0.8):
+def build_exact_index(clean_nse_names, nse_symbols):
+    """
+    Cleaned NSE name -> symbol for O(1) exact lookups
+    The first symbol wins on duplicate names, same as the fuzzy search
+    """
+    exact_index = {}
+    for name, symbol in zip(clean_nse_names, nse_symbols):
+        exact_index.setdefault(name, symbol)
+    return exact_index
+
+
+def find_best_match(holdings_name, clean_nse_names, nse_symbols, threshold=0.8, exact_index=None):
     """
     Find best matching ticker from NSE list
     Uses fuzzy matching for close matches
+    clean_nse_names / nse_symbols: parallel lists built once by the caller
+    exact_index: optional build_exact_index() result, probed before the fuzzy scan
     """
     # Clean the holdings name
     clean_holdings = clean_company_name(holdings_name)
     
-    # Try exact match first (cleaned)
-    for nse_name, symbol in nse_dict.items():
-        clean_nse = clean_company_name(nse_name)
-        if clean_holdings == clean_nse:
+    # Exact cleaned-name hit - no need to scan the whole list
+    if exact_index is not None:
+        symbol = exact_index.get(clean_holdings)
+        if symbol is not None:
             return symbol, 1.0, 'exact'
     
-    # Try fuzzy match
-    best_match = None
-    best_score = 0
-    best_nse_name = None
+    # score_cutoff lets rapidfuzz skip candidates that cannot reach the threshold
+    result = process.extractOne(
+        clean_holdings, clean_nse_names,
+        scorer=fuzz.ratio, score_cutoff=threshold * 100
+    )
     
-    for nse_name, symbol in nse_dict.items():
-        clean_nse = clean_company_name(nse_name)
-        score = similarity_score(clean_holdings, clean_nse)
-        
-        if score > best_score:
-            best_score = score
-            best_match = symbol
-            best_nse_name = nse_name
+    if result is None:
+        return None, 0, 'no_match'
+    
+    _, score, idx = result
     
-    if best_score >= threshold:
-        return best_match, best_score, 'fuzzy'
+    if score == 100:
+        return nse_symbols[idx], 1.0, 'exact'
     
-    return None, 0, 'no_match'
+    return nse_symbols[idx], score / 100, 'fuzzy'
 
 
-def match_all_holdings(holdings_df, nse_dict):
+def match_all_holdings(holdings_df, nse_dict, threshold=0.8):
     """
     Match all holdings to NSE tickers
     Returns: matched_dict, unmatched_list
     """
+    unique_securities = pd.unique(holdings_df['Security Name'].to_numpy())
+    total = len(unique_securities)
+    
     print("\n" + "="*80)
     print("MATCHING HOLDINGS TO NSE EQUITY LIST")
     print("="*80)
     print(f"\nNSE Equity List: {len(nse_dict)} companies")
-    print(f"Holdings to match: {len(holdings_df['Security Name'].unique())}")
+    print(f"Holdings to match: {total}")
     print("\n" + "="*80 + "\n")
     
     matched = {}
     unmatched = []
     
-    unique_securities = holdings_df['Security Name'].unique()
+    # Clean every NSE name once up front, not once per holding
+    clean_nse_names = load_clean_nse_names(nse_dict)
+    nse_symbols = list(nse_dict.values())
+    
+    # Identical holdings against an identical NSE list resolve from the cache
+    match_key = _fingerprint([*_CLEANING_RULES, *nse_dict.items(), threshold, *unique_securities])
+    resolved_file = CACHE_DIR / f"resolved_{match_key}.json"
+    results = None
+    try:
+        with open(resolved_file, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+    except Exception:
+        pass
     
-    for idx, security_name in enumerate(unique_securities, 1):
-        print(f"[{idx:3d}/{len(unique_securities)}] {security_name[:50]:50s} ", end='', flush=True)
+    if results is None or len(results) != total:
+        clean_holdings = [clean_company_name(name) for name in unique_securities]
         
-        ticker, score, match_type = find_best_match(security_name, nse_dict)
+        # Exact cleaned-name matches are a dict probe; only the rest need fuzzy scoring
+        exact_index = build_exact_index(clean_nse_names, nse_symbols)
+        results = [None] * total
+        fuzzy_rows = []
+        for row, clean_name in enumerate(clean_holdings):
+            symbol = exact_index.get(clean_name)
+            if symbol is not None:
+                results[row] = [symbol, 100.0]
+            else:
+                fuzzy_rows.append(row)
+        
+        if fuzzy_rows:
+            # Score the remaining holdings against every NSE name in one multi-threaded call;
+            # scores under the threshold come back as 0
+            scores = process.cdist(
+                [clean_holdings[row] for row in fuzzy_rows], clean_nse_names,
+                scorer=fuzz.ratio, score_cutoff=threshold * 100, workers=-1
+            )
+            best_idx = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(fuzzy_rows)), best_idx]
+            
+            for row, nse_idx, score in zip(fuzzy_rows, best_idx, best_scores):
+                results[row] = [nse_symbols[nse_idx], float(score)] if score > 0 else [None, 0.0]
+        
+        try:
+            CACHE_DIR.mkdir(exist_ok=True)
+            # Keep only the current match set - every other key is stale
+            for old_file in CACHE_DIR.glob('resolved_*.json'):
+                old_file.unlink()
+            with open(resolved_file, 'w', encoding='utf-8') as f:
+                json.dump(results, f)
+        except OSError as e:
+            print(f"⚠️  Could not write match cache: {e}")
+    
+    # Collect status lines and write them once - per-row flushed prints dominate the loop
+    lines = []
+    
+    for idx, (security_name, (ticker, score)) in enumerate(zip(unique_securities, results), 1):
+        prefix = f"[{idx:3d}/{total}] {security_name[:50]:50s} "
         
         if ticker:
             matched[security_name] = ticker
-            if match_type == 'exact':
-                print(f"✓ {ticker:15s} (exact)")
+            if score == 100:
+                lines.append(f"{prefix}✓ {ticker:15s} (exact)")
             else:
-                print(f"≈ {ticker:15s} (fuzzy {score:.0%})")
+                lines.append(f"{prefix}≈ {ticker:15s} (fuzzy {score / 100:.0%})")
         else:
             unmatched.append(security_name)
-            print("✗ no match")
+            lines.append(f"{prefix}✗ no match")
+    
+    if lines:
+        print("\n".join(lines))
     
     print("\n" + "="*80)
     print("MATCHING COMPLETE")
     print("="*80)
-    print(f"✓ Matched:   {len(matched)}/{len(unique_securities)} ({len(matched)/len(unique_securities)*100:.1f}%)")
-    print(f"✗ Unmatched: {len(unmatched)}/{len(unique_securities)}")
+    print(f"✓ Matched:   {len(matched)}/{total} ({len(matched)/total*100:.1f}%)")
+    print(f"✗ Unmatched: {len(unmatched)}/{total}")
     print("="*80 + "\n")
     
     return matched, unmatched
@@ -145,10 +273,10 @@ def match_all_holdings(holdings_df, nse_dict):
 
 def save_matched_tickers(matched_dict, output_file='nse_matched_tickers.csv'):
     """Save matched tickers to CSV"""
-    df = pd.DataFrame([
-        {'Security_Name': name, 'NSE_Symbol': ticker}
-        for name, ticker in matched_dict.items()
-    ])
+    df = pd.DataFrame({
+        'Security_Name': list(matched_dict.keys()),
+        'NSE_Symbol': list(matched_dict.values())
+    })
     
     df.to_csv(output_file, index=False)
     print(f"✓ Saved matched tickers to: {output_file}")
@@ -192,22 +320,26 @@ def update_validated_tickers(matched_dict):
         print("❌ Could not read validated_tickers.py")
         return False
     
-    # Find dictionary end
-    dict_end = content.rfind('}')
+    # Find the end of VALIDATED_NSE_TICKERS - its closing brace is the first
+    # unindented '}' after the assignment (entries are indented)
+    dict_start = content.find('VALIDATED_NSE_TICKERS = {')
+    dict_end = content.find('\n}', dict_start) if dict_start != -1 else -1
     if dict_end == -1:
         print("❌ Could not find dictionary")
         return False
+    dict_end += 1  # insert right before the '}' itself
     
     # Generate entries
-    new_entries = "\n    # === NSE EQUITY LIST MATCHES ===\n"
-    for security, ticker in sorted(matched_dict.items()):
-        new_entries += f"    '{security}': '{ticker}',\n"
-    
-    # Update
-    updated_content = content[:dict_end] + new_entries + content[dict_end:]
+    new_entries = "\n    # === NSE EQUITY LIST MATCHES ===\n" + ''.join(
+        f"    '{security}': '{ticker}',\n"
+        for security, ticker in sorted(matched_dict.items())
+    )
     
+    # Update - write the pieces straight out instead of concatenating a copy of the file
     with open('validated_tickers.py', 'w', encoding='utf-8') as f:
-        f.write(updated_content)
+        f.write(content[:dict_end])
+        f.write(new_entries)
+        f.write(content[dict_end:])
     
     print(f"✓ Updated validated_tickers.py with {len(matched_dict)} mappings")
     
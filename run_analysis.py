@@ -37,7 +37,8 @@ from monthly_analyzer import (
 from enhanced_main import (
     calculate_investor_portfolios,
     calculate_fund_portfolio,
-    calculate_monthly_returns
+    calculate_monthly_returns,
+    calculate_monthly_returns_batch
 )
 from enhanced_visualizer import (
     create_interactive_comparison_dashboard,
@@ -72,6 +73,11 @@ def main():
             print("❌ ERROR: No holdings data loaded")
             return 1
         
+        # Names repeat across thousands of rows - categorical codes make isin/groupby compare ints
+        holdings_df['Security Name'] = holdings_df['Security Name'].astype('category')
+        if 'NAME' in holdings_df.columns:
+            holdings_df['NAME'] = holdings_df['NAME'].astype('category')
+        
         # Check for multiple investors
         has_multiple_investors = 'NAME' in holdings_df.columns
         if has_multiple_investors:
@@ -172,12 +178,8 @@ def main():
         # Analyze monthly performance
         monthly_performance = analyze_all_investors(investor_portfolios, INVESTMENT_DATE)
         
-        # Calculate monthly returns for visualization
-        monthly_returns = {}
-        for investor_name, portfolio_series in investor_portfolios.items():
-            monthly_ret = calculate_monthly_returns(portfolio_series, INVESTMENT_DATE)
-            if len(monthly_ret) > 0:
-                monthly_returns[investor_name] = monthly_ret
+        # Calculate monthly returns for visualization (all investors in one resample)
+        monthly_returns = calculate_monthly_returns_batch(investor_portfolios, INVESTMENT_DATE)
         
         # ============================================================
         # STEP 7: Benchmark Comparison
@@ -268,34 +270,33 @@ def main():
             print(f"\n📊 Performance as of {latest_month.strftime('%B %Y')}:")
             print("-" * 50)
             
-            # Get final returns
-            investor_final_returns = []
-            for name, returns in monthly_returns.items():
-                if len(returns) > 0:
-                    final_return = returns.iloc[-1]
-                    investor_final_returns.append((name, final_return))
+            # Get final returns as aligned name/value arrays
+            names = [name for name, returns in monthly_returns.items() if len(returns) > 0]
+            finals = np.fromiter(
+                (returns.iloc[-1] for returns in monthly_returns.values() if len(returns) > 0),
+                dtype=float, count=len(names)
+            )
             
-            # Sort by performance
-            investor_final_returns.sort(key=lambda x: x[1], reverse=True)
+            # Sort by performance (stable, so ties keep their original order)
+            order = np.argsort(-finals, kind='stable')
             
             # Show top performers
             print("\n🏆 Top 5 Performers:")
-            for i, (name, ret) in enumerate(investor_final_returns[:5], 1):
-                print(f"  {i}. {name[:30]:30s}: {ret:>8.2f}%")
+            for i, idx in enumerate(order[:5], 1):
+                print(f"  {i}. {names[idx][:30]:30s}: {finals[idx]:>8.2f}%")
             
             # Show bottom performers
-            if len(investor_final_returns) > 5:
+            if len(finals) > 5:
                 print("\n📉 Bottom 5 Performers:")
-                for i, (name, ret) in enumerate(investor_final_returns[-5:], 1):
-                    print(f"  {i}. {name[:30]:30s}: {ret:>8.2f}%")
+                for i, idx in enumerate(order[-5:], 1):
+                    print(f"  {i}. {names[idx][:30]:30s}: {finals[idx]:>8.2f}%")
             
             # Statistics
-            returns_values = [ret for _, ret in investor_final_returns]
             print(f"\n📊 Overall Statistics:")
-            print(f"  Average Return: {np.mean(returns_values):.2f}%")
-            print(f"  Median Return: {np.median(returns_values):.2f}%")
-            print(f"  Best Return: {max(returns_values):.2f}%")
-            print(f"  Worst Return: {min(returns_values):.2f}%")
+            print(f"  Average Return: {finals.mean():.2f}%")
+            print(f"  Median Return: {np.median(finals):.2f}%")
+            print(f"  Best Return: {finals.max():.2f}%")
+            print(f"  Worst Return: {finals.min():.2f}%")
             
             # Benchmark comparison
             if len(nifty_monthly) > 0:
@@ -304,9 +305,9 @@ def main():
                 print(f"  NIFTY 50: {nifty_return:.2f}%")
                 
                 # Count outperformers
-                outperformers = sum(1 for _, ret in investor_final_returns if ret > nifty_return)
-                pct_outperform = outperformers / len(investor_final_returns) * 100
-                print(f"\n  ✓ {outperformers}/{len(investor_final_returns)} investors beat NIFTY 50 ({pct_outperform:.1f}%)")
+                outperformers = int(np.count_nonzero(finals > nifty_return))
+                pct_outperform = outperformers / len(finals) * 100
+                print(f"\n  ✓ {outperformers}/{len(finals)} investors beat NIFTY 50 ({pct_outperform:.1f}%)")
             
             if len(multi_cap_monthly) > 0:
                 print(f"  GM Multi Cap: {multi_cap_monthly.iloc[-1]:.2f}%")
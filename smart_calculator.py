@@ -2,35 +2,125 @@
 Smart Portfolio Calculator
 Uses ONLY available stock data - no fake interpolation
 """
+import os
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
+# numba is optional - without it the portfolio kernel runs as plain NumPy
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
-def calculate_portfolio_with_partial_data(holdings_df, stock_data, dates):
+# Below this many investors the NumPy kernel runs on a single thread
+PARALLEL_MIN_INVESTORS = 64
+
+
+def _compute_portfolio_range(price_matrix, holdings_idx, holdings_ptr, quantities, out, first, last):
+    """Fill out[first:last] - investors are independent, so ranges can run concurrently"""
+    for i in range(first, last):
+        start, end = holdings_ptr[i], holdings_ptr[i + 1]
+        out[i] = price_matrix[:, holdings_idx[start:end]] @ quantities[start:end]
+
+
+def _compute_all_portfolios(price_matrix, holdings_idx, holdings_ptr, quantities, out):
+    """
+    Fill out[i] with investor i's portfolio value over time
+    Holdings are CSR-packed: holdings_ptr[i]..holdings_ptr[i+1] index investor i's
+    columns in price_matrix (dates x securities) and their quantities
+    Large investor counts are split across threads; NumPy releases the GIL
+    for the gather and matrix product, and every thread shares price_matrix
+    """
+    n_investors = len(holdings_ptr) - 1
+    n_workers = min(os.cpu_count() or 1, n_investors // PARALLEL_MIN_INVESTORS)
+    
+    if n_workers <= 1:
+        _compute_portfolio_range(price_matrix, holdings_idx, holdings_ptr, quantities, out, 0, n_investors)
+        return
+    
+    bounds = np.linspace(0, n_investors, n_workers + 1).astype(int)
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        futures = [
+            pool.submit(_compute_portfolio_range, price_matrix, holdings_idx, holdings_ptr,
+                        quantities, out, first, last)
+            for first, last in zip(bounds[:-1], bounds[1:])
+        ]
+        for future in futures:
+            future.result()
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _compute_all_portfolios(price_matrix, holdings_idx, holdings_ptr, quantities, out):
+        n_dates = price_matrix.shape[0]
+        for i in prange(len(holdings_ptr) - 1):
+            for k in range(holdings_ptr[i], holdings_ptr[i + 1]):
+                col = holdings_idx[k]
+                qty = quantities[k]
+                for t in range(n_dates):
+                    out[i, t] += price_matrix[t, col] * qty
+
+
+def group_by_investor(holdings_df):
+    """Group holdings by investor once, for reuse across the calculators below"""
+    return holdings_df.groupby('NAME', observed=True)
+
+
+def calculate_portfolio_with_partial_data(holdings_df, stock_data, dates, groups=None):
     """
     Calculate portfolio values using only available stock data
     For missing stocks, use proportional estimation
+    groups: optional result of group_by_investor(holdings_df), built here if omitted
     """
+    if groups is None:
+        groups = group_by_investor(holdings_df)
+    
     investor_portfolios = {}
+    available = frozenset(stock_data)
     
-    for investor_name, group in holdings_df.groupby('NAME'):
-        # Separate holdings into "have data" and "no data"
-        holdings_with_data = group[group['Security Name'].isin(stock_data.keys())]
-        holdings_without_data = group[~group['Security Name'].isin(stock_data.keys())]
-        
-        # Calculate value for stocks we HAVE data for
-        portfolio_with_data = pd.Series(0.0, index=dates)
+    # Align each held security to `dates` once; every investor reuses these columns
+    held_securities = [s for s in holdings_df['Security Name'].unique() if s in available]
+    aligned_prices = pd.DataFrame(
+        {
+            security: stock_data[security].reindex(dates, method='ffill').to_numpy(dtype=float)
+            for security in held_securities
+        },
+        index=dates
+    ).fillna(0)
+    column_index = {security: i for i, security in enumerate(held_securities)}
+    
+    # Separate each investor's holdings into "have data" and "no data",
+    # packing the tracked ones for a single kernel call over all investors
+    investors = []
+    holdings_idx, quantities, holdings_ptr = [], [], [0]
+    
+    for investor_name, rows in groups.indices.items():
+        group = holdings_df.iloc[rows]
+        has_data = group['Security Name'].isin(available)
+        holdings_with_data = group[has_data]
+        holdings_without_data = group[~has_data]
+        investors.append((investor_name, holdings_with_data, holdings_without_data))
         
-        for _, row in holdings_with_data.iterrows():
-            security = row['Security Name']
-            holding_qty = row['Holding']
-            
-            if security in stock_data:
-                prices = stock_data[security]
-                aligned_prices = prices.reindex(dates, method='ffill')
-                stock_value = aligned_prices * holding_qty
-                portfolio_with_data += stock_value.fillna(0)
+        holdings_idx.extend(column_index[s] for s in holdings_with_data['Security Name'])
+        quantities.extend(holdings_with_data['Holding'].to_numpy(dtype=float))
+        holdings_ptr.append(len(holdings_idx))
+    
+    # Calculate value for stocks we HAVE data for
+    values = np.zeros((len(investors), len(dates)))
+    # Missing prices/quantities contribute 0, as fillna(0) did in the per-investor loop
+    _compute_all_portfolios(
+        np.ascontiguousarray(np.nan_to_num(aligned_prices.to_numpy(dtype=float))),
+        np.asarray(holdings_idx, dtype=np.int64),
+        np.asarray(holdings_ptr, dtype=np.int64),
+        np.nan_to_num(np.asarray(quantities, dtype=float)),
+        values
+    )
+    
+    for i, (investor_name, holdings_with_data, holdings_without_data) in enumerate(investors):
+        portfolio_with_data = pd.Series(values[i], index=dates)
         
         # For stocks WITHOUT data, estimate based on current value
         if len(holdings_without_data) > 0:
@@ -50,28 +140,42 @@ def calculate_portfolio_with_partial_data(holdings_df, stock_data, dates):
     return investor_portfolios
 
 
-def calculate_coverage_stats(holdings_df, stock_data):
-    """Calculate how much of the portfolio we actually have data for"""
-    stats = []
+def calculate_coverage_stats(holdings_df, stock_data, groups=None):
+    """
+    Calculate how much of the portfolio we actually have data for
+    groups: optional result of group_by_investor(holdings_df), built here if omitted
+    """
+    if groups is None:
+        groups = group_by_investor(holdings_df)
     
-    for investor_name, group in holdings_df.groupby('NAME'):
-        total_value = group['Demat Holding Vlaue (Rs.)'].sum()
-        
-        holdings_with_data = group[group['Security Name'].isin(stock_data.keys())]
-        value_with_data = holdings_with_data['Demat Holding Vlaue (Rs.)'].sum()
-        
-        coverage = (value_with_data / total_value * 100) if total_value > 0 else 0
-        
-        stats.append({
-            'Investor': investor_name,
-            'Total Holdings': len(group),
-            'Holdings with Data': len(holdings_with_data),
-            'Total Value': total_value,
-            'Value with Data': value_with_data,
-            'Coverage %': coverage
-        })
-    
-    return pd.DataFrame(stats)
+    available = frozenset(stock_data)
+    has_data = holdings_df['Security Name'].isin(available).to_numpy()
+    # NaN values are skipped, as the per-investor sum() did
+    values = np.nan_to_num(holdings_df['Demat Holding Vlaue (Rs.)'].to_numpy(dtype=float))
+    
+    # Investor code per row from the precomputed group indices (-1 = no investor)
+    investor_names = list(groups.indices)
+    codes = np.full(len(holdings_df), -1, dtype=np.int64)
+    for code, rows in enumerate(groups.indices.values()):
+        codes[rows] = code
+    
+    # One bincount per column over all investors instead of a per-investor loop
+    keep = codes >= 0
+    codes, has_data, values = codes[keep], has_data[keep], values[keep]
+    n = len(investor_names)
+    
+    stats = pd.DataFrame({
+        'Investor': investor_names,
+        'Total Holdings': np.bincount(codes, minlength=n),
+        'Holdings with Data': np.bincount(codes, weights=has_data, minlength=n).astype(int),
+        'Total Value': np.bincount(codes, weights=values, minlength=n),
+        'Value with Data': np.bincount(codes, weights=np.where(has_data, values, 0), minlength=n),
+    })
+    
+    total_value = stats['Total Value']
+    stats['Coverage %'] = (stats['Value with Data'] / total_value * 100).where(total_value > 0, 0)
+    
+    return stats
 
 
 def export_coverage_report(coverage_df, output_file='ticker_reports/coverage_report.csv'):
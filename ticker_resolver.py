@@ -2,11 +2,38 @@
 Smart Ticker Resolver - Finds working tickers with multiple fallback strategies
 """
 import pandas as pd
+import numpy as np
 import yfinance as yf
 from datetime import datetime
 import time
 import os
-from validated_tickers import VALIDATED_NSE_TICKERS, get_validated_ticker
+import re
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from rapidfuzz import fuzz, process
+from validated_tickers import VALIDATED_NSE_TICKERS, get_validated_ticker, normalize_name, build_normalized_map
+from yf_helpers import get_yf_session, monthly_closes
+
+# Status lines are buffered and written this many at a time
+PROGRESS_BATCH = 50
+
+# Ticker lookups in flight at once - kept low to stay under Yahoo's rate limit
+MAX_CONCURRENT_LOOKUPS = 8
+
+# Resolved tickers from earlier runs, keyed on clean_security_name
+# (renamed from ticker_cache.json, which could hold unverified fuzzy matches)
+TICKER_CACHE_FILE = os.path.join('reports', 'ticker_reports', 'verified_ticker_cache.json')
+
+# Upper bound on guessed ticker variations per security
+MAX_VARIATIONS = 6
+
+# Offline name matches scoring at least this (token_sort_ratio, 0-100) skip the Yahoo probes.
+# token_sort_ratio compares whole names, so "ATUL AUTO" can't match "ATUL" the way
+# WRatio's token-set scoring (subset -> 95) allowed
+FUZZY_MATCH_SCORER = fuzz.token_sort_ratio
+FUZZY_MATCH_CUTOFF = 95
 
 
 # Comprehensive NSE ticker mapping - COMPLETE DATABASE
@@ -122,27 +149,46 @@ NSE_TICKER_MAP = {
     'ANIL LIMITED': 'ANILLTD',
 }
 
+# NSE_TICKER_MAP keyed on normalized names, so LTD/LIMITED and punctuation variants still hit
+NORMALIZED_TICKER_MAP = build_normalized_map(NSE_TICKER_MAP)
+
+# In-memory fuzzy index over every known company name (validated entries win)
+KNOWN_TICKERS = {**NSE_TICKER_MAP, **VALIDATED_NSE_TICKERS}
+KNOWN_NAMES = list(KNOWN_TICKERS)
+
+
+# Equity markers and face values stripped from security names, longest first
+_CLEAN_RE = re.compile(
+    r' EQ NEW RS\. 2/-?| EQ NEW FV RS\. 2/-?| EQ NEW| RS\. 10/-| RS\. 2/-| EQ| NEW| 10/-| 2/-'
+)
 
+
+@lru_cache(maxsize=4096)
 def clean_security_name(name):
     """Clean and standardize security name"""
     clean = str(name).upper().strip()
-    clean = clean.replace(' EQ NEW RS. 2/-', '').replace(' EQ NEW RS. 2/', '')
-    clean = clean.replace(' EQ NEW FV RS. 2/-', '').replace(' EQ NEW', '')
-    clean = clean.replace(' RS. 10/-', '').replace(' RS. 2/-', '')
-    clean = clean.replace(' EQ', '').replace(' NEW', '')
-    clean = clean.replace(' FV RS. 10/-', '').replace(' FV RS. 2/-', '')
-    clean = clean.replace(' 10/-', '').replace(' 2/-', '')
+    clean = _CLEAN_RE.sub('', clean)
     return clean.strip()
 
 
+def clean_security_names(names):
+    """clean_security_name over a whole Series in one vectorized pass"""
+    return (
+        names.astype(str).str.upper().str.strip()
+        .str.replace(_CLEAN_RE, '', regex=True).str.strip()
+    )
+
+
+@lru_cache(maxsize=4096)
 def try_ticker_variations(base_name):
-    """Generate multiple ticker variations to try"""
+    """Generate multiple ticker variations to try (returned as a tuple - the result is memoized)"""
     variations = []
     
-    # Try exact match from map
-    if base_name in NSE_TICKER_MAP:
-        variations.append(NSE_TICKER_MAP[base_name] + '.NS')
-        variations.append(NSE_TICKER_MAP[base_name] + '.BO')
+    # Try exact (normalized) match from map
+    mapped = NORMALIZED_TICKER_MAP.get(normalize_name(base_name))
+    if mapped:
+        variations.append(mapped + '.NS')
+        variations.append(mapped + '.BO')
     
     # Extract first word
     words = base_name.split()
@@ -165,73 +211,229 @@ def try_ticker_variations(base_name):
             variations.append(abbrev + '.NS')
             variations.append(abbrev + '.BO')
     
-    return list(dict.fromkeys(variations))  # Remove duplicates
+    # Remove duplicates, keeping at most MAX_VARIATIONS
+    seen = set()
+    unique = []
+    for variation in variations:
+        if variation not in seen:
+            seen.add(variation)
+            unique.append(variation)
+            if len(unique) >= MAX_VARIATIONS:
+                break
+    
+    return tuple(unique)
+
 
+# (ticker, start_date) pairs that returned data - failures are not remembered,
+# since they may just be a transient error or a 429 from concurrent probes
+_WORKING_TICKERS = set()
 
-def test_ticker(ticker, start_date, quick_test=True):
-    """Test if a ticker returns valid data"""
+
+def test_ticker(ticker, start_date):
+    """Test if a ticker returns valid data (successes are memoized - the same variations recur across securities)"""
+    if (ticker, start_date) in _WORKING_TICKERS:
+        return True
     try:
-        stock = yf.Ticker(ticker)
-        if quick_test:
-            # Quick test - just check info
-            info = stock.info
-            if info and 'regularMarketPrice' in info:
-                return True
-        else:
-            # Full test - fetch historical data
-            hist = stock.history(start=start_date, period='1mo')
-            if not hist.empty and len(hist) > 0:
-                return True
+        # One history request - stock.info hits Yahoo's slow, heavily rate-limited quoteSummary endpoint
+        hist = yf.Ticker(ticker, session=get_yf_session()).history(start=start_date, period='1mo')
     except Exception as e:
         # Don't print errors during testing
-        pass
-    return False
+        return False
+    
+    if hist.empty:
+        return False
+    _WORKING_TICKERS.add((ticker, start_date))
+    return True
 
 
-def find_working_ticker(security_name, start_date):
-    """Find a working ticker for a security with multiple attempts"""
+def find_working_ticker(security_name, start_date, offline=True):
+    """
+    Find a working ticker for a security with multiple attempts
+    offline=False skips the fuzzy name lookup - for callers that already ran it
+    (resolve_all_tickers does, in bulk, via find_tickers_offline)
+    """
     # Try validated database first (only confirmed working tickers)
     ticker = get_validated_ticker(security_name)
     if ticker:
-        if test_ticker(ticker, start_date, quick_test=False):
+        if test_ticker(ticker, start_date):
             return ticker
     
-    # Fallback to variations (but less likely to work)
     clean_name = clean_security_name(security_name)
+    
+    # Offline fuzzy lookup against the known names - no network round trip
+    match = process.extractOne(
+        clean_name, KNOWN_NAMES, scorer=FUZZY_MATCH_SCORER, score_cutoff=FUZZY_MATCH_CUTOFF
+    ) if offline else None
+    if match is not None:
+        matched_ticker = KNOWN_TICKERS[match[0]] + '.NS'
+        if matched_ticker != ticker:  # don't hand back the ticker that just failed
+            return matched_ticker
+    
+    # Fallback to variations (but less likely to work)
     variations = try_ticker_variations(clean_name)
     
     for ticker in variations[:3]:  # Only try first 3 variations to save time
-        if test_ticker(ticker, start_date, quick_test=False):
+        if test_ticker(ticker, start_date):
             return ticker
         time.sleep(0.1)
     
     return None
 
 
+def find_tickers_offline(clean_names):
+    """
+    Offline fuzzy lookup for many cleaned names at once - no network
+    Scores every name against KNOWN_NAMES in one multi-threaded cdist call
+    Returns a ticker per name, None where nothing reaches FUZZY_MATCH_CUTOFF
+    """
+    if not clean_names:
+        return []
+    
+    scores = process.cdist(
+        clean_names, KNOWN_NAMES,
+        scorer=FUZZY_MATCH_SCORER, score_cutoff=FUZZY_MATCH_CUTOFF, workers=-1
+    )
+    best_idx = scores.argmax(axis=1)
+    best_scores = scores[np.arange(len(clean_names)), best_idx]
+    
+    return [
+        KNOWN_TICKERS[KNOWN_NAMES[name_idx]] + '.NS' if score > 0 else None
+        for name_idx, score in zip(best_idx, best_scores)
+    ]
+
+
+def load_ticker_cache(cache_file=TICKER_CACHE_FILE):
+    """Load {clean security name: ticker} saved by earlier runs"""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_ticker_cache(cache, cache_file=TICKER_CACHE_FILE):
+    """Write the ticker cache atomically - a temp file renamed over the old one"""
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_file = cache_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print(f"⚠️  Could not write ticker cache: {e}")
+
+
+async def _find_working_tickers(security_names, start_date, on_result):
+    """
+    Run find_working_ticker for every name concurrently
+    on_result(security_name, ticker) is called as each lookup finishes (ticker None on failure)
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_LOOKUPS)
+    
+    async def find_one(security_name):
+        async with semaphore:
+            try:
+                # The offline lookup already ran for these names in find_tickers_offline
+                ticker = await asyncio.to_thread(find_working_ticker, security_name, start_date, False)
+            except Exception:
+                ticker = None
+            return security_name, ticker
+    
+    for next_done in asyncio.as_completed([find_one(name) for name in security_names]):
+        on_result(*await next_done)
+
+
+def _run_lookups(security_names, start_date, on_result):
+    """Drive _find_working_tickers to completion, even when called from inside a running event loop"""
+    lookups = _find_working_tickers(security_names, start_date, on_result)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(lookups)
+        return
+    
+    # Already inside an event loop (Jupyter, async callers): asyncio.run would raise,
+    # so give the lookups their own loop on a worker thread
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(asyncio.run, lookups).result()
+
+
 def resolve_all_tickers(holdings_df, start_date):
     """
     Resolve tickers for all securities
     Returns: success_map, failed_list
     """
-    unique_securities = holdings_df['Security Name'].unique()
+    security_names = holdings_df['Security Name'].drop_duplicates()
+    unique_securities = security_names.tolist()
     
     print(f"\n🔍 Resolving tickers for {len(unique_securities)} unique securities...")
     print("=" * 80)
     
     success_map = {}
     failed_list = []
-    
-    for idx, security_name in enumerate(unique_securities, 1):
-        print(f"[{idx:3d}/{len(unique_securities)}] {security_name[:50]:50s} ", end='', flush=True)
-        
-        ticker = find_working_ticker(security_name, start_date)
+    lines = []
+    total = len(unique_securities)
+    positions = {name: idx for idx, name in enumerate(unique_securities, 1)}
+    
+    def status_line(security_name, ticker, status=""):
+        prefix = f"[{positions[security_name]:3d}/{total}] {security_name[:50]:50s} "
+        return f"{prefix}✓ {ticker}{status}" if ticker else f"{prefix}✗ NO TICKER FOUND"
+    
+    # Names resolved on an earlier run skip the lookup entirely
+    cache = load_ticker_cache()
+    clean_names = clean_security_names(security_names).tolist()
+    clean_by_name = dict(zip(unique_securities, clean_names))
+    misses = [(name, clean) for name, clean in zip(unique_securities, clean_names) if clean not in cache]
+    
+    # Offline fuzzy matching first, spread across all cores by rapidfuzz
+    offline = find_tickers_offline([clean for _, clean in misses])
+    found = {name: ticker for (name, _), ticker in zip(misses, offline) if ticker}
+    
+    # Cached and offline results are known up front - report them in input order
+    resolved = {}
+    for security_name, clean_name in zip(unique_securities, clean_names):
+        if security_name in found:
+            resolved[security_name] = found[security_name]
+            lines.append(status_line(security_name, found[security_name]))
+        elif clean_name in cache:
+            resolved[security_name] = cache[clean_name]
+            lines.append(status_line(security_name, cache[clean_name], " (cached)"))
         
+        if len(lines) >= PROGRESS_BATCH:
+            print("\n".join(lines), flush=True)
+            lines.clear()
+    
+    if lines:
+        print("\n".join(lines), flush=True)
+    
+    # Only the residual misses need Yahoo; those lookups are network-bound, so overlap
+    # them - and report each one as it finishes, since this is the slow phase
+    residual = [name for name, _ in misses if name not in found]
+    if residual:
+        print(f"\n🌐 Looking up {len(residual)} remaining securities on Yahoo Finance...", flush=True)
+    
+    def on_result(security_name, ticker):
+        resolved[security_name] = ticker
+        print(status_line(security_name, ticker), flush=True)
+    
+    _run_lookups(residual, start_date, on_result)
+    
+    for security_name in unique_securities:
+        ticker = resolved.get(security_name)
         if ticker:
             success_map[security_name] = ticker
-            print(f"✓ {ticker}")
         else:
             failed_list.append(security_name)
-            print("✗ NO TICKER FOUND")
+    
+    # Only Yahoo-verified tickers are remembered - offline fuzzy hits are never
+    # probed, so caching them would make a wrong match permanent
+    new_entries = {
+        clean_by_name[name]: resolved[name]
+        for name in residual if resolved.get(name)
+    }
+    if new_entries:
+        cache.update(new_entries)
+        save_ticker_cache(cache)
     
     print("\n" + "=" * 80)
     print(f"✅ Success: {len(success_map)}/{len(unique_securities)}")
@@ -245,10 +447,10 @@ def save_ticker_report(success_map, failed_list, output_folder='reports/ticker_r
     os.makedirs(output_folder, exist_ok=True)
     
     # Success report
-    success_df = pd.DataFrame([
-        {'Security Name': name, 'Ticker': ticker}
-        for name, ticker in success_map.items()
-    ])
+    success_df = pd.DataFrame({
+        'Security Name': list(success_map.keys()),
+        'Ticker': list(success_map.values())
+    })
     success_file = os.path.join(output_folder, 'successful_tickers.csv')
     success_df.to_csv(success_file, index=False)
     
@@ -312,32 +514,51 @@ def fetch_stock_data_batch(ticker_map, start_date, end_date=None):
     stock_data = {}
     success = 0
     failed = 0
+    lines = []
     
-    for idx, (security_name, ticker) in enumerate(ticker_map.items(), 1):
-        print(f"[{idx:3d}/{len(ticker_map)}] {ticker:15s} ", end='', flush=True)
-        
+    # One batched download for every ticker - yfinance multiplexes the requests itself
+    tickers = list(dict.fromkeys(ticker_map.values()))
+    history = pd.DataFrame()
+    download_error = None
+    if tickers:
         try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(start=start_date, end=end_date)
-            
-            if not hist.empty:
-                # Remove timezone
-                if hasattr(hist.index, 'tz'):
-                    hist.index = hist.index.tz_localize(None)
-                
-                # Monthly closing prices
-                monthly = hist['Close'].resample('ME').last()
-                stock_data[security_name] = monthly
-                print(f"✓ ({len(monthly)} months)")
-                success += 1
-            else:
-                print("✗ (no data)")
-                failed += 1
+            history = yf.download(
+                tickers, start=start_date, end=end_date, group_by='ticker',
+                threads=True, progress=False, auto_adjust=True,
+                session=get_yf_session()
+            )
         except Exception as e:
-            print(f"✗ ({str(e)[:30]})")
+            download_error = e
+    
+    # Remove timezone
+    if getattr(history.index, 'tz', None) is not None:
+        history.index = history.index.tz_localize(None)
+    
+    # Monthly closing prices for every ticker in one resample
+    monthly_by_ticker = monthly_closes(history, tickers)
+    
+    for idx, (security_name, ticker) in enumerate(ticker_map.items(), 1):
+        prefix = f"[{idx:3d}/{len(ticker_map)}] {ticker:15s} "
+        
+        monthly = monthly_by_ticker.get(ticker)
+        
+        if download_error is not None:
+            lines.append(f"{prefix}✗ ({str(download_error)[:30]})")
+            failed += 1
+        elif monthly is not None:
+            stock_data[security_name] = monthly
+            lines.append(f"{prefix}✓ ({len(monthly)} months)")
+            success += 1
+        else:
+            lines.append(f"{prefix}✗ (no data)")
             failed += 1
         
-        time.sleep(0.1)  # Rate limiting
+        if len(lines) >= PROGRESS_BATCH:
+            print("\n".join(lines), flush=True)
+            lines.clear()
+    
+    if lines:
+        print("\n".join(lines))
     
     print("\n" + "=" * 80)
     print(f"✅ Data fetched: {success}/{len(ticker_map)}")
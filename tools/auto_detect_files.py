@@ -9,7 +9,6 @@ from pathlib import Path
 def find_excel_files():
     """Find all Excel files in current directory"""
     project_dir = Path.cwd()
-    excel_files = list(project_dir.glob('*.xlsx'))
     
     print("\n" + "="*80)
     print("EXCEL FILES FOUND")
@@ -18,7 +17,11 @@ def find_excel_files():
     holdings_files = []
     weights_files = []
     
-    for file in excel_files:
+    # One directory pass - list and categorize while the names are in hand
+    for file in project_dir.iterdir():
+        if not file.name.lower().endswith('.xlsx'):
+            continue
+        
         print(f"  {file.name}")
         
         # Categorize files
@@ -42,6 +42,10 @@ def backup_old_files(
             if move:
                 shutil.move(str(src), str(dest))
                 action = "Moved"
+            elif add_timestamp:
+                # The name already records when the backup was taken - skip copying metadata
+                shutil.copyfile(str(src), str(dest))
+                action = "Copied"
             else:
                 shutil.copy2(str(src), str(dest))
                 action = "Copied"
@@ -1,19 +1,43 @@
 """
 DATA SCRAPER - Separate module for downloading stock data
 Run this ONCE to download all data, then use cached data in main analysis
+
+pandas and yfinance are imported inside the functions that use them, so the
+state/stats helpers and the usage text load without paying for either
 """
-import pandas as pd
-import yfinance as yf
 from datetime import datetime
+import importlib.util
 import os
+import re
 import json
+import sys
+from functools import lru_cache
 from pathlib import Path
 
+# `python tools/data_scraper.py` only puts tools/ on sys.path - the shared
+# yfinance helpers live in the project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from yf_helpers import get_yf_session, monthly_closes
+
+# orjson is optional - the state file falls back to the stdlib json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# prices.parquet needs a parquet engine; without one the per-security CSVs are used.
+# find_spec only checks the engine is installed, it doesn't import it
+PARQUET_AVAILABLE = any(
+    importlib.util.find_spec(engine) is not None for engine in ('pyarrow', 'fastparquet')
+)
+
 
 # Configuration - uses data/ directory
 DATA_DIR = Path("data") / "scraped_data"
 STATE_FILE = DATA_DIR / "download_state.json"
 PRICE_DATA_DIR = DATA_DIR / "prices"
+PRICES_FILE = DATA_DIR / "prices.parquet"
 
 
 def init_scraper():
@@ -25,16 +49,21 @@ def init_scraper():
 def load_download_state():
     """Load download state to track what's already downloaded"""
     if STATE_FILE.exists():
+        if ORJSON_AVAILABLE:
+            return orjson.loads(STATE_FILE.read_bytes())
         with open(STATE_FILE, 'r') as f:
             return json.load(f)
     return {'downloaded': {}, 'failed': [], 'last_run': None}
 
 
 def save_download_state(state):
-    """Save download state"""
+    """Save download state (compact - it is a recovery aid, not meant for reading)"""
     state['last_run'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if ORJSON_AVAILABLE:
+        STATE_FILE.write_bytes(orjson.dumps(state))
+        return
     with open(STATE_FILE, 'w') as f:
-        json.dump(state, f, indent=2)
+        json.dump(state, f, separators=(',', ':'))
 
 
 def is_already_downloaded(security_name, state):
@@ -42,34 +71,119 @@ def is_already_downloaded(security_name, state):
     return security_name in state['downloaded']
 
 
+# Path separators and spaces become '_', every other character that is not
+# str.isalnum() or '_' is dropped (\W is exactly that set, for all of Unicode)
+_FILENAME_SEP_TABLE = str.maketrans({'/': '_', '\\': '_', ' ': '_'})
+_FILENAME_DROP_RE = re.compile(r'\W')
+
+
+@lru_cache(maxsize=4096)
 def get_price_filename(security_name):
-    """Get filename for price data"""
-    clean = security_name.replace('/', '_').replace('\\', '_').replace(' ', '_')
-    clean = ''.join(c for c in clean if c.isalnum() or c == '_')
+    """Get filename for price data (memoized - the same names recur across scraping and loading)"""
+    clean = _FILENAME_DROP_RE.sub('', security_name.translate(_FILENAME_SEP_TABLE))
     return PRICE_DATA_DIR / f"{clean[:50]}.csv"
 
 
-def download_stock_data(ticker, start_date, end_date=None):
-    """Download data from yfinance"""
+def load_price_cache():
+    """Read the combined prices.parquet (one column per security), or None if unavailable"""
+    if not PRICES_FILE.exists():
+        return None
+    
+    import pandas as pd
+    try:
+        return pd.read_parquet(PRICES_FILE)
+    except Exception:
+        return None
+
+
+def save_price_cache(series_by_name):
+    """
+    Merge monthly series into the single prices.parquet
+    Needs pyarrow (or fastparquet); without one the per-security CSVs are used instead
+    Returns True if the parquet file was written
+    """
+    if not series_by_name or not PARQUET_AVAILABLE:
+        return False
+    
+    import pandas as pd
+    try:
+        prices = pd.concat(series_by_name, axis=1)
+        existing = load_price_cache()
+        if existing is not None:
+            existing = existing.drop(columns=[c for c in prices.columns if c in existing.columns])
+            prices = pd.concat([existing, prices], axis=1).sort_index()
+        prices.to_parquet(PRICES_FILE)
+        return True
+    except ImportError:
+        return False
+    except Exception as e:
+        print(f"⚠️  Could not write {PRICES_FILE}: {e}")
+        return False
+
+
+def write_downloaded_batch(unsaved, state):
+    """
+    Write the downloaded series in one go and record them in the state
+    Goes into prices.parquet when possible, else one CSV per security
+    Returns where the data went (prices.parquet or the CSV directory)
+    """
+    saved_to = PRICES_FILE if PARQUET_AVAILABLE else PRICE_DATA_DIR
+    if save_price_cache(unsaved):
+        files = dict.fromkeys(unsaved, PRICES_FILE)
+    else:
+        files = {}
+        for security_name, data in unsaved.items():
+            files[security_name] = get_price_filename(security_name)
+            data.to_csv(files[security_name])
+            saved_to = PRICE_DATA_DIR
+    
+    downloaded_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    for security_name in unsaved:
+        state['downloaded'][security_name]['file'] = str(files[security_name])
+        state['downloaded'][security_name]['downloaded_at'] = downloaded_at
+    
+    save_download_state(state)
+    unsaved.clear()
+    return saved_to
+
+
+def is_saved(security_name, state):
+    """Check the recorded price file (or the legacy CSV path) is still on disk"""
+    file = state['downloaded'][security_name].get('file')
+    if file is not None and Path(file).exists():
+        return True
+    return get_price_filename(security_name).exists()
+
+
+def download_stock_data(tickers, start_date, end_date=None):
+    """
+    Download data from yfinance for a list of tickers in one batched call
+    Returns: dict of {ticker: monthly_close_series} (tickers without data are left out)
+    """
     if end_date is None:
         end_date = datetime.now().strftime('%Y-%m-%d')
     
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+    
+    import yfinance as yf
+    
     try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(start=start_date, end=end_date)
-        
-        if not hist.empty:
-            # Remove timezone
-            if hasattr(hist.index, 'tz'):
-                hist.index = hist.index.tz_localize(None)
-            
-            # Get monthly data
-            monthly = hist['Close'].resample('ME').last()
-            return monthly
+        history = yf.download(
+            tickers, start=start_date, end=end_date, group_by='ticker',
+            threads=True, progress=False, auto_adjust=True,
+            session=get_yf_session()
+        )
     except Exception as e:
-        return pd.Series()
+        return {}
+    
+    # Remove timezone
+    if getattr(history.index, 'tz', None) is not None:
+        history.index = history.index.tz_localize(None)
     
-    return pd.Series()
+    # Get monthly data for every ticker in one resample
+    return monthly_closes(history, tickers)
 
 
 def scrape_all_stocks(ticker_map, start_date, force_redownload=False):
@@ -106,54 +220,52 @@ def scrape_all_stocks(ticker_map, start_date, force_redownload=False):
     failed_count = 0
     skipped_count = 0
     
+    # STRICT CHECK: Skip if already downloaded and not forcing
+    to_download = []
     for idx, (security_name, ticker) in enumerate(ticker_map.items(), 1):
-        # STRICT CHECK: Skip if already downloaded and not forcing
         if not force_redownload:
-            if is_already_downloaded(security_name, state):
-                filename = get_price_filename(security_name)
-                if filename.exists():
-                    # File exists and is in state - DEFINITELY skip
-                    skipped_count += 1
-                    continue
-        
-        print(f"[{idx:3d}/{len(ticker_map)}] {security_name[:45]:45s} ", end='', flush=True)
+            if is_already_downloaded(security_name, state) and is_saved(security_name, state):
+                # File exists and is in state - DEFINITELY skip
+                skipped_count += 1
+                continue
+        to_download.append((idx, security_name, ticker))
+    
+    # Download everything that is left in one batched call
+    downloaded = download_stock_data([ticker for _, _, ticker in to_download], start_date)
+    unsaved = {}
+    
+    for idx, security_name, ticker in to_download:
+        prefix = f"[{idx:3d}/{len(ticker_map)}] {security_name[:45]:45s} "
         
-        # Download data
-        data = download_stock_data(ticker, start_date)
+        data = downloaded.get(ticker)
         
-        if len(data) > 0:
-            # Save to file
-            filename = get_price_filename(security_name)
-            data.to_csv(filename)
+        if data is not None and len(data) > 0:
+            # Buffered - everything is written once after the loop
+            unsaved[security_name] = data
             
-            # Update state
+            # Update state (file and timestamp are filled in when the data is written)
             state['downloaded'][security_name] = {
                 'ticker': ticker,
-                'file': str(filename),
                 'data_points': len(data),
-                'downloaded_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
             
             # Remove from failed list if it was there
             if security_name in state['failed']:
                 state['failed'].remove(security_name)
             
-            print(f"✓ ({len(data)} months)")
+            print(f"{prefix}✓ ({len(data)} months)")
             success_count += 1
         else:
             # Add to failed list
             if security_name not in state['failed']:
                 state['failed'].append(security_name)
             
-            print("✗ failed")
+            print(f"{prefix}✗ failed")
             failed_count += 1
-        
-        # Save state periodically (every 10 downloads)
-        if (success_count + failed_count) % 10 == 0:
-            save_download_state(state)
     
-    # Final state save
-    save_download_state(state)
+    # Data came from a single download, so write it (and the state) once -
+    # rewriting prices.parquet per batch would grow quadratically
+    saved_to = write_downloaded_batch(unsaved, state)
     
     print("\n" + "="*80)
     print("SCRAPING COMPLETE")
@@ -161,7 +273,7 @@ def scrape_all_stocks(ticker_map, start_date, force_redownload=False):
     print(f"✓ Successfully downloaded: {success_count}")
     print(f"⭐ Skipped (already cached): {skipped_count}")
     print(f"✗ Failed:                   {failed_count}")
-    print(f"📂 Data saved to: {PRICE_DATA_DIR}/")
+    print(f"📂 Data saved to: {saved_to}")
     print(f"📊 State file: {STATE_FILE}")
     print("\nYou can now run main.py to analyze the data!")
     print("="*80 + "\n")
@@ -179,16 +291,30 @@ def load_scraped_data():
     
     print(f"\n📦 Loading {len(state['downloaded'])} scraped securities...")
     
+    import pandas as pd
+    
+    # One columnar read covers everything stored in prices.parquet
+    prices = load_price_cache()
+    
     stock_data = {}
     success = 0
     failed = 0
+    from_csv = False
     
     for security_name, info in state['downloaded'].items():
+        if prices is not None and security_name in prices.columns:
+            # Columns share one index - trim each back to its own first..last
+            # month, which is exactly the series its CSV would have held
+            column = prices[security_name]
+            stock_data[security_name] = column.loc[column.first_valid_index():column.last_valid_index()]
+            success += 1
+            continue
+        
         try:
             filename = Path(info['file'])
             
             # Handle both old and new path formats
-            if not filename.exists():
+            if not filename.exists() or filename == PRICES_FILE:
                 # Try alternative path
                 filename = get_price_filename(security_name)
             
@@ -205,6 +331,7 @@ def load_scraped_data():
                     continue
                 
                 success += 1
+                from_csv = True
             else:
                 failed += 1
                 print(f"  ⚠️  File not found: {filename}")
@@ -213,6 +340,10 @@ def load_scraped_data():
             failed += 1
             print(f"  ⚠️  Error loading {security_name}: {e}")
     
+    # Fold CSV-only securities into the combined file so the next load skips them
+    if from_csv and PARQUET_AVAILABLE:
+        save_price_cache(stock_data)
+    
     print(f"✓ Loaded {success}/{len(state['downloaded'])} securities from cache")
     
     if failed > 0:
@@ -2,29 +2,179 @@
 SHEET NAME DETECTOR
 Finds correct sheet names in Excel files
 """
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
 import pandas as pd
+from itertools import islice
 from pathlib import Path
 
+# Columns listed per sheet in the preview
+PREVIEW_COLUMNS = 5
+
+# File and sheet classification - one scan per name instead of chained `in` checks
+_HOLDINGS_RE = re.compile(r"demat|holding|nil", re.I)
+_WEIGHTS_RE = re.compile(r"weight|current", re.I)
+_MULTICAP_RE = re.compile(r"(?=.*multi)(?=.*cap)", re.I | re.S)
+_MIDSMALL_RE = re.compile(r"(?=.*mid)(?=.*small)", re.I | re.S)
+
+# Sheet selection answer: "N" to choose, "?N" to preview
+_CHOICE_RE = re.compile(r"(\?)?([1-9][0-9]*)")
+
+
+# Workbook handles opened during a run, keyed by path - closed by close_workbooks()
+_OPEN_WORKBOOKS = {}
+
+
+def _excel_file(path_str):
+    """
+    Open a workbook once per path and share the handle between the sheet
+    listing and every preview: a calamine ExcelFile when python-calamine is
+    installed, otherwise a read-only openpyxl workbook (no cells loaded up front)
+    """
+    xl_file = _OPEN_WORKBOOKS.get(path_str)
+    if xl_file is None:
+        try:
+            xl_file = pd.ExcelFile(path_str, engine="calamine")
+        except (ImportError, ValueError):
+            # python-calamine not installed (or pandas too old to know the engine)
+            from openpyxl import load_workbook
+            xl_file = load_workbook(path_str, read_only=True, data_only=True)
+        _OPEN_WORKBOOKS[path_str] = xl_file
+    return xl_file
+
+
+def close_workbooks():
+    """Close every workbook opened by _excel_file - read-only openpyxl keeps the file open (and locked on Windows)"""
+    while _OPEN_WORKBOOKS:
+        _, xl_file = _OPEN_WORKBOOKS.popitem()
+        xl_file.close()
+
+
+def _sheet_names_from_zip(excel_file):
+    """
+    Read sheet names straight from xl/workbook.xml inside the .xlsx zip -
+    no workbook parse at all. Raises KeyError/BadZipFile for non-xlsx files
+    """
+    with zipfile.ZipFile(excel_file) as archive:
+        root = ET.fromstring(archive.read("xl/workbook.xml"))
+    # Match on the local tag name so both transitional and strict namespaces work
+    return [el.get("name") for el in root.iter() if el.tag.rpartition("}")[2] == "sheet"]
+
 
 def detect_sheet_names(excel_file):
     """Detect all sheet names in an Excel file"""
     try:
-        xl_file = pd.ExcelFile(excel_file)
-        return xl_file.sheet_names
+        sheets = _sheet_names_from_zip(excel_file)
+        if sheets:
+            return sheets
+    except (KeyError, zipfile.BadZipFile, ET.ParseError):
+        pass
+    
+    try:
+        xl_file = _excel_file(str(excel_file))
+        if isinstance(xl_file, pd.ExcelFile):
+            return xl_file.sheet_names
+        return xl_file.sheetnames
     except Exception as e:
         print(f"Error reading {excel_file.name}: {e}")
         return []
 
 
-def preview_sheet_data(excel_file, sheet_name, rows=5):
-    """Preview first few rows of a sheet"""
+def _header_from_row(row):
+    """Name blank header cells the way pandas does"""
+    return [col if col is not None else f"Unnamed: {i}" for i, col in enumerate(row)]
+
+
+def _preview_handle(excel_file):
+    """Cached workbook handle shared by all previews, or None if it can't be opened"""
     try:
-        df = pd.read_excel(excel_file, sheet_name=sheet_name, nrows=rows)
-        return df
+        return _excel_file(str(excel_file))
     except Exception as e:
+        print(f"Error opening {excel_file.name} for preview: {e}")
         return None
 
 
+def sheet_columns(xl_file, sheet_name):
+    """Column names of a sheet - reads the header row only"""
+    if xl_file is None:
+        return []
+    try:
+        if isinstance(xl_file, pd.ExcelFile):
+            return xl_file.parse(sheet_name, nrows=0).columns.tolist()
+        
+        header = next(xl_file[sheet_name].iter_rows(max_row=1, values_only=True), ())
+        return _header_from_row(header)
+    except Exception as e:
+        return []
+
+
+def preview_sheet_data(xl_file, sheet_name, rows=5, max_cols=None):
+    """
+    Preview first few rows of a sheet from an already opened workbook
+    max_cols: read only the leading columns (must not exceed the sheet's width)
+    """
+    try:
+        if isinstance(xl_file, pd.ExcelFile):
+            usecols = list(range(max_cols)) if max_cols else None
+            return xl_file.parse(sheet_name, nrows=rows, usecols=usecols)
+        
+        # Stream just the header and the first rows instead of parsing the sheet
+        sheet_rows = [
+            row[:max_cols]
+            for row in islice(xl_file[sheet_name].iter_rows(values_only=True), rows + 1)
+        ]
+        if not sheet_rows:
+            return None
+        
+        return pd.DataFrame(sheet_rows[1:], columns=_header_from_row(sheet_rows[0]))
+    except Exception as e:
+        return None
+
+
+def _preview_lines(xl_file, sheet):
+    """
+    Column preview lines for one sheet - the full header gives the count,
+    rows are read only for the columns actually shown
+    """
+    columns = sheet_columns(xl_file, sheet)
+    shown = min(len(columns), PREVIEW_COLUMNS)
+    df = preview_sheet_data(xl_file, sheet, rows=3, max_cols=shown) if shown else None
+    if df is None or len(df) == 0:
+        return []
+    
+    lines = [f"     Columns: {', '.join(df.columns.tolist())}"]
+    if len(columns) > PREVIEW_COLUMNS:
+        lines.append(f"              ... and {len(columns) - PREVIEW_COLUMNS} more")
+    return lines
+
+
+def describe_sheet(excel_file, sheet):
+    """Print the column preview for one sheet - only read when the user asks for it"""
+    lines = _preview_lines(_preview_handle(excel_file), sheet)
+    print("\n".join(lines) if lines else "     (no preview available)")
+
+
+def _choose_sheet(excel_file, sheets):
+    """Prompt for a sheet number; '?N' previews sheet N's columns before choosing"""
+    while True:
+        answer = input(f"\nEnter number (1-{len(sheets)}), or ?N to preview a sheet: ").strip()
+        match = _CHOICE_RE.fullmatch(answer)
+        if not match:
+            print("Please enter a valid number")
+            continue
+        
+        preview, choice = match.group(1), int(match.group(2))
+        if choice > len(sheets):
+            print(f"Please enter a number between 1 and {len(sheets)}")
+        elif preview:
+            print(f"\n  {choice}. {sheets[choice - 1]}")
+            describe_sheet(excel_file, sheets[choice - 1])
+        else:
+            return sheets[choice - 1]
+
+
 def find_holdings_sheet(excel_file):
     """Find the most likely holdings sheet"""
     sheets = detect_sheet_names(excel_file)
@@ -33,16 +183,14 @@ def find_holdings_sheet(excel_file):
     print("="*80)
     print(f"Found {len(sheets)} sheets:\n")
     
+    lines = []
     for idx, sheet in enumerate(sheets, 1):
-        print(f"  {idx}. {sheet}")
-        
-        # Preview data
-        df = preview_sheet_data(excel_file, sheet, rows=3)
-        if df is not None and len(df) > 0:
-            print(f"     Columns: {', '.join(df.columns[:5].tolist())}")
-            if len(df.columns) > 5:
-                print(f"              ... and {len(df.columns) - 5} more")
-        print()
+        lines.append(f"  {idx}. {sheet}")
+        lines.append("")
+    
+    # Sheet listing is printed in one go rather than line by line
+    if lines:
+        print("\n".join(lines))
     
     return sheets
 
@@ -58,34 +206,28 @@ def find_fund_sheets(excel_file):
     multi_cap_sheet = None
     mid_small_sheet = None
     
+    lines = []
     for idx, sheet in enumerate(sheets, 1):
-        print(f"  {idx}. {sheet}")
+        lines.append(f"  {idx}. {sheet}")
         
         # Check if it's a fund sheet
-        sheet_lower = sheet.lower()
-        if 'multi' in sheet_lower and 'cap' in sheet_lower:
+        if _MULTICAP_RE.match(sheet):
             multi_cap_sheet = sheet
-            print(f"     ✓ Detected as Multi Cap Fund sheet")
-        elif 'mid' in sheet_lower and 'small' in sheet_lower:
+            lines.append(f"     ✓ Detected as Multi Cap Fund sheet")
+        elif _MIDSMALL_RE.match(sheet):
             mid_small_sheet = sheet
-            print(f"     ✓ Detected as Mid & Small Cap Fund sheet")
-        
-        # Preview data
-        df = preview_sheet_data(excel_file, sheet, rows=3)
-        if df is not None and len(df) > 0:
-            print(f"     Columns: {', '.join(df.columns[:5].tolist())}")
-            if len(df.columns) > 5:
-                print(f"              ... and {len(df.columns) - 5} more")
-        print()
+            lines.append(f"     ✓ Detected as Mid & Small Cap Fund sheet")
+        lines.append("")
+    
+    # Sheet listing is printed in one go rather than line by line
+    if lines:
+        print("\n".join(lines))
     
     return sheets, multi_cap_sheet, mid_small_sheet
 
 
-def update_config_with_sheets(holdings_file, holdings_sheet, weights_file, 
-                               multi_cap_sheet, mid_small_sheet):
-    """Update config.py with correct sheet names"""
-    
-    config_content = f'''"""
+# config.py written by update_config_with_sheets (str.format placeholders)
+_CONFIG_TEMPLATE = '''"""
 Configuration for Investment Comparison Analysis
 Auto-detected Excel files and sheet names
 """
@@ -141,35 +283,58 @@ if __name__ == "__main__":
     print(f"  Reports: {{REPORTS_DIR}}")
     print("="*80 + "\\n")
 '''
+
+
+def update_config_with_sheets(holdings_file, holdings_sheet, weights_file, 
+                               multi_cap_sheet, mid_small_sheet):
+    """Update config.py with correct sheet names"""
+    
+    config_content = _CONFIG_TEMPLATE.format(
+        holdings_file=holdings_file,
+        holdings_sheet=holdings_sheet,
+        weights_file=weights_file,
+        multi_cap_sheet=multi_cap_sheet,
+        mid_small_sheet=mid_small_sheet
+    )
     
-    with open('config.py', 'w', encoding='utf-8') as f:
-        f.write(config_content)
+    # Written as UTF-8 bytes so the file keeps '\n' line endings on every platform
+    Path('config.py').write_bytes(config_content.encode('utf-8'))
     
     print("\n✓ Updated config.py")
 
 
 def main():
     """Main workflow"""
+    try:
+        _run()
+    finally:
+        close_workbooks()
+
+
+def _run():
+    """Detect files and sheets, prompt for the choices, and write config.py"""
     print("\n" + "="*80)
     print("EXCEL SHEET NAME DETECTOR")
     print("="*80)
     
-    # Find Excel files
-    excel_files = list(Path.cwd().glob('*.xlsx'))
-    
-    if not excel_files:
-        print("\n❌ No Excel files found!")
-        return
-    
+    # Find Excel files - one directory pass, classified as we go
+    excel_count = 0
     holdings_files = []
     weights_files = []
     
-    for file in excel_files:
-        name_lower = file.name.lower()
-        if 'demat' in name_lower or 'holding' in name_lower or 'nil' in name_lower:
-            holdings_files.append(file)
-        elif 'weight' in name_lower or 'current' in name_lower:
-            weights_files.append(file)
+    with os.scandir(Path.cwd()) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith('.xlsx') or not entry.is_file():
+                continue
+            excel_count += 1
+            if _HOLDINGS_RE.search(entry.name):
+                holdings_files.append(Path(entry.path))
+            elif _WEIGHTS_RE.search(entry.name):
+                weights_files.append(Path(entry.path))
+    
+    if not excel_count:
+        print("\n❌ No Excel files found!")
+        return
     
     if not holdings_files or not weights_files:
         print("\n❌ Could not find both holdings and weights files!")
@@ -200,16 +365,7 @@ def main():
     for idx, sheet in enumerate(holdings_sheets, 1):
         print(f"  {idx}. {sheet}")
     
-    while True:
-        try:
-            choice = int(input(f"\nEnter number (1-{len(holdings_sheets)}): "))
-            if 1 <= choice <= len(holdings_sheets):
-                holdings_sheet = holdings_sheets[choice - 1]
-                break
-            else:
-                print(f"Please enter a number between 1 and {len(holdings_sheets)}")
-        except ValueError:
-            print("Please enter a valid number")
+    holdings_sheet = _choose_sheet(holdings_file, holdings_sheets)
     
     # Fund sheets
     fund_sheets, auto_multi_cap, auto_mid_small = find_fund_sheets(weights_file)
@@ -237,14 +393,7 @@ def main():
         for idx, sheet in enumerate(fund_sheets, 1):
             print(f"  {idx}. {sheet}")
         
-        while True:
-            try:
-                choice = int(input(f"\nEnter number (1-{len(fund_sheets)}): "))
-                if 1 <= choice <= len(fund_sheets):
-                    multi_cap_sheet = fund_sheets[choice - 1]
-                    break
-            except ValueError:
-                pass
+        multi_cap_sheet = _choose_sheet(weights_file, fund_sheets)
     
     # Select Mid & Small Cap sheet
     print("\n" + "="*80)
@@ -265,14 +414,7 @@ def main():
         for idx, sheet in enumerate(fund_sheets, 1):
             print(f"  {idx}. {sheet}")
         
-        while True:
-            try:
-                choice = int(input(f"\nEnter number (1-{len(fund_sheets)}): "))
-                if 1 <= choice <= len(fund_sheets):
-                    mid_small_sheet = fund_sheets[choice - 1]
-                    break
-            except ValueError:
-                pass
+        mid_small_sheet = _choose_sheet(weights_file, fund_sheets)
     
     # Update config
     print("\n" + "="*80)
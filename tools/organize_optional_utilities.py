@@ -24,12 +24,22 @@ def move_optional_utilities(
 
     print(f"\n📁 Organizing optional utilities into: {tools_dir.resolve()}\n")
 
+    # One directory listing instead of an exists() check per file
+    wanted = frozenset(optional_files)
+    with os.scandir(base_dir) as entries:
+        present = {entry.name for entry in entries if entry.name in wanted and entry.is_file()}
+
     for filename in optional_files:
         src = base_dir / filename
         dest = tools_dir / filename
         
-        if src.exists():
-            shutil.move(str(src), str(dest))
+        if filename in present:
+            try:
+                # Same filesystem by construction - a metadata-only rename
+                os.replace(src, dest)
+            except OSError:
+                # e.g. tools/ mounted elsewhere: copy + unlink
+                shutil.move(str(src), str(dest))
             print(f"  ✓ Moved: {filename} → {tools_folder_name}/")
         else:
             print(f"  ⚠️  Skipped (not found): {filename}")
@@ -2,6 +2,8 @@
 VALIDATED NSE TICKER DATABASE
 Only tickers that are CONFIRMED to work with yfinance
 """
+import re
+from functools import lru_cache
 
 # These are 100% VERIFIED working tickers
 VALIDATED_NSE_TICKERS = {
@@ -1040,21 +1042,48 @@ VALIDATED_NSE_TICKERS = {
 }
 
 
+# Common equity suffixes stripped before lookup (built once, not per call)
+_SUFFIX_PATTERNS = (
+    ' EQ NEW FV RE.1/-', ' EQ NEW FV RS.1/-', ' EQ NEW FV RS.2/-',
+    ' EQ NEW FV RS.5/-', ' EQ NEW FV RS.10/-', ' EQ NEW FV Rs.2/-',
+    ' EQ NEW RS. 2/-', ' EQ NEW RS. 10/-', ' EQ. NEW RS.1', ' EQ. NEW RS. 2',
+    ' EQ NEW RE.1/-', ' EQ NEW F.V. RS.2/-', ' EQ NEW F.V. RS.5/-',
+    ' EQ NEW F RE. 1/-', ' EQ EQ', ' EQ', 
+)
+
+
+_COMPANY_SUFFIX_RE = re.compile(r'\b(?:LIMITED|LTD)\b')
+_NON_ALNUM_RE = re.compile(r'[^A-Z0-9]')
+
+
+def normalize_name(name):
+    """
+    Uppercase, spell '&' as AND, drop LIMITED/LTD and every non-alphanumeric character,
+    for O(1) key lookups ('LARSEN & TOUBRO LIMITED' == 'LARSEN AND TOUBRO LTD')
+    """
+    name = str(name).upper().replace('&', ' AND ')
+    return _NON_ALNUM_RE.sub('', _COMPANY_SUFFIX_RE.sub('', name))
+
+
+def build_normalized_map(ticker_map):
+    """Re-key a name -> ticker dict on normalize_name (first entry wins on collisions)"""
+    normalized = {}
+    for name, ticker in ticker_map.items():
+        normalized.setdefault(normalize_name(name), ticker)
+    return normalized
+
+
+_NORMALIZED_VALIDATED = build_normalized_map(VALIDATED_NSE_TICKERS)
+
+
+@lru_cache(maxsize=4096)
 def get_validated_ticker(security_name):
-    """Get ticker from validated database only"""
+    """Get ticker from validated database only (memoized - the partial match scans the whole dict)"""
     # Clean the name
     clean = str(security_name).upper().strip()
     
     # Remove common suffixes
-    remove_patterns = [
-        ' EQ NEW FV RE.1/-', ' EQ NEW FV RS.1/-', ' EQ NEW FV RS.2/-',
-        ' EQ NEW FV RS.5/-', ' EQ NEW FV RS.10/-', ' EQ NEW FV Rs.2/-',
-        ' EQ NEW RS. 2/-', ' EQ NEW RS. 10/-', ' EQ. NEW RS.1', ' EQ. NEW RS. 2',
-        ' EQ NEW RE.1/-', ' EQ NEW F.V. RS.2/-', ' EQ NEW F.V. RS.5/-',
-        ' EQ NEW F RE. 1/-', ' EQ EQ', ' EQ', 
-    ]
-    
-    for pattern in remove_patterns:
+    for pattern in _SUFFIX_PATTERNS:
         clean = clean.replace(pattern, '')
     
     clean = clean.strip()
@@ -1063,6 +1092,11 @@ def get_validated_ticker(security_name):
     if clean in VALIDATED_NSE_TICKERS:
         return VALIDATED_NSE_TICKERS[clean] + '.NS'
     
+    # Normalized match (LTD vs LIMITED, punctuation, spacing)
+    ticker = _NORMALIZED_VALIDATED.get(normalize_name(clean))
+    if ticker:
+        return ticker + '.NS'
+    
     # Partial match (for variations)
     for key, ticker in VALIDATED_NSE_TICKERS.items():
         if key in clean or clean in key:
@@ -0,0 +1,51 @@
+"""
+YFINANCE HELPERS
+Shared by ticker_resolver and tools/data_scraper
+
+Dependencies are imported inside the functions, so the scraper's usage text
+and state helpers still load without them
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def get_yf_session():
+    """
+    One HTTP session shared by every yfinance call - connections and Yahoo's
+    cookie/crumb handshake are reused instead of renegotiated per ticker
+    Recent yfinance only accepts curl_cffi sessions; older releases take requests
+    """
+    try:
+        from curl_cffi import requests as curl_requests
+        return curl_requests.Session(impersonate="chrome")
+    except ImportError:
+        import requests
+        return requests.Session()
+
+
+def monthly_closes(history, tickers):
+    """
+    Month-end closes for every ticker from one resample over the wide Close frame
+    Each series is trimmed to its own first..last month; tickers without data are left out
+    """
+    import pandas as pd
+    
+    if isinstance(history.columns, pd.MultiIndex):
+        present = set(history.columns.get_level_values(0))
+        closes = {ticker: history[ticker]['Close'] for ticker in tickers if ticker in present}
+    elif 'Close' in history.columns and len(tickers) == 1:
+        closes = {tickers[0]: history['Close']}
+    else:
+        closes = {}
+    
+    if not closes:
+        return {}
+    
+    monthly_wide = pd.concat(closes, axis=1).resample('ME').last()
+    
+    monthly = {}
+    for ticker, column in monthly_wide.items():
+        first, last = column.first_valid_index(), column.last_valid_index()
+        if first is not None:
+            monthly[ticker] = column.loc[first:last].rename('Close')
+    return monthly